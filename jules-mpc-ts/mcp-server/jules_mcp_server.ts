@@ -9,6 +9,8 @@ const SERVER_VERSION = "2.0.0";
 export const DEFAULT_API_BASE = "https://jules.googleapis.com/v1alpha";
 export const API_BASE = process.env.JULES_API_BASE ?? DEFAULT_API_BASE;
 export const API_KEY = process.env.JULES_API_KEY;
+// API_BASE is fixed for the life of the process; normalize it once.
+const API_BASE_PREFIX = `${API_BASE.replace(/\/$/, "")}/`;
 
 type JsonRecord = Record<string, unknown>;
 type StructuredContent = Record<string, unknown> | undefined;
@@ -27,14 +29,19 @@ export function buildHeaders(): HeadersInit {
   return headers;
 }
 
+// Headers only depend on the environment, so they are built once per process.
+const API_HEADERS = buildHeaders();
+
+/** Send a request to `path` relative to API_BASE and decode the JSON response. */
 export async function requestJson(
-  url: string,
+  path: string,
   options: RequestInit = {}
 ): Promise<unknown> {
+  const url = urlJoin(path);
   const response = await fetch(url, {
     ...options,
     headers: {
-      ...buildHeaders(),
+      ...API_HEADERS,
       ...(options.headers ?? {}),
     },
   });
@@ -53,14 +60,21 @@ export async function requestJson(
 }
 
 export function urlJoin(path: string): string {
-  const normalized = path.startsWith("/") ? path.slice(1) : path;
-  return `${API_BASE.replace(/\/$/, "")}/${normalized}`;
+  return API_BASE_PREFIX + (path.startsWith("/") ? path.slice(1) : path);
+}
+
+function pageQuery(pageSize?: number, pageToken?: string): string {
+  const params = new URLSearchParams();
+  if (pageSize !== undefined) params.set("pageSize", String(pageSize));
+  if (pageToken) params.set("pageToken", pageToken);
+  const query = params.toString();
+  return query ? `?${query}` : "";
 }
 
 // --- API helpers ---
 
 export async function createSession(payload: JsonRecord): Promise<unknown> {
-  return requestJson(urlJoin("sessions"), {
+  return requestJson("sessions", {
     method: "POST",
     headers: { "Content-Type": "application/json" },
     body: JSON.stringify(payload),
@@ -68,29 +82,26 @@ export async function createSession(payload: JsonRecord): Promise<unknown> {
 }
 
 export async function getSession(sessionId: string): Promise<unknown> {
-  return requestJson(urlJoin(`sessions/${sessionId}`));
+  return requestJson(`sessions/${sessionId}`);
 }
 
 export async function listSessions(
   pageSize?: number,
   pageToken?: string
 ): Promise<unknown> {
-  const params = new URLSearchParams();
-  if (pageSize !== undefined) params.set("pageSize", String(pageSize));
-  if (pageToken) params.set("pageToken", pageToken);
-  const query = params.toString() ? `?${params.toString()}` : "";
-  return requestJson(urlJoin(`sessions${query}`));
+  const query = pageQuery(pageSize, pageToken);
+  return requestJson(`sessions${query}`);
 }
 
 export async function deleteSession(sessionId: string): Promise<unknown> {
-  return requestJson(urlJoin(`sessions/${sessionId}`), { method: "DELETE" });
+  return requestJson(`sessions/${sessionId}`, { method: "DELETE" });
 }
 
 export async function sendMessage(
   sessionId: string,
   prompt: string
 ): Promise<unknown> {
-  return requestJson(urlJoin(`sessions/${sessionId}:sendMessage`), {
+  return requestJson(`sessions/${sessionId}:sendMessage`, {
     method: "POST",
     headers: { "Content-Type": "application/json" },
     body: JSON.stringify({ prompt }),
@@ -98,7 +109,7 @@ export async function sendMessage(
 }
 
 export async function approvePlan(sessionId: string): Promise<unknown> {
-  return requestJson(urlJoin(`sessions/${sessionId}:approvePlan`), {
+  return requestJson(`sessions/${sessionId}:approvePlan`, {
     method: "POST",
     headers: { "Content-Type": "application/json" },
     body: JSON.stringify({}),
@@ -110,35 +121,27 @@ export async function listActivities(
   pageSize?: number,
   pageToken?: string
 ): Promise<unknown> {
-  const params = new URLSearchParams();
-  if (pageSize !== undefined) params.set("pageSize", String(pageSize));
-  if (pageToken) params.set("pageToken", pageToken);
-  const query = params.toString() ? `?${params.toString()}` : "";
-  return requestJson(urlJoin(`sessions/${sessionId}/activities${query}`));
+  const query = pageQuery(pageSize, pageToken);
+  return requestJson(`sessions/${sessionId}/activities${query}`);
 }
 
 export async function getActivity(
   sessionId: string,
   activityId: string
 ): Promise<unknown> {
-  return requestJson(
-    urlJoin(`sessions/${sessionId}/activities/${activityId}`)
-  );
+  return requestJson(`sessions/${sessionId}/activities/${activityId}`);
 }
 
 export async function listSources(
   pageSize?: number,
   pageToken?: string
 ): Promise<unknown> {
-  const params = new URLSearchParams();
-  if (pageSize !== undefined) params.set("pageSize", String(pageSize));
-  if (pageToken) params.set("pageToken", pageToken);
-  const query = params.toString() ? `?${params.toString()}` : "";
-  return requestJson(urlJoin(`sources${query}`));
+  const query = pageQuery(pageSize, pageToken);
+  return requestJson(`sources${query}`);
 }
 
 export async function getSource(sourceId: string): Promise<unknown> {
-  return requestJson(urlJoin(`sources/${sourceId}`));
+  return requestJson(`sources/${sourceId}`);
 }
 
 // --- Response helpers ---
@@ -1,7 +1,15 @@
-import { execFile } from "child_process";
+import { spawn } from "child_process";
 import { dirname } from "path";
 import { promises as fs } from "fs";
 import { fileURLToPath } from "url";
+import {
+  createLineReader,
+  encodeToolCall,
+  McpClient,
+  type McpToolCall,
+} from "../src/mcp_client.js";
+
+export type { McpToolCall };
 
 const DEFAULT_CONFIG_PATH = process.env.JULES_CONFIG ?? "jules-manager/config.json";
 
@@ -9,6 +17,8 @@ type JsonRecord = Record<string, unknown>;
 
 type MCPCommand = string[];
 
+type EventHandler = (event: JsonRecord, mcp: McpTarget) => Promise<void>;
+
 async function loadEvent(): Promise<JsonRecord> {
   const raw = process.env.JULES_EVENT;
   if (!raw) {
@@ -29,56 +39,104 @@ async function loadConfig(path: string): Promise<JsonRecord> {
   }
 }
 
-async function runMcp(
+/** Run several tool calls against one MCP server process, in order of `calls`. */
+export async function runMcpBatch(
   command: MCPCommand,
-  tool: string,
-  arguments_: JsonRecord
-): Promise<JsonRecord> {
+  calls: McpToolCall[]
+): Promise<JsonRecord[]> {
+  if (calls.length === 0) {
+    return [];
+  }
   return new Promise((resolve, reject) => {
-    const request = {
-      jsonrpc: "2.0",
-      id: "event-handler",
-      method: "tools/call",
-      params: { name: tool, arguments: arguments_ },
+    const ids = calls.map((_, index) => `event-handler-${index}`);
+    const outstanding = new Set<unknown>(ids);
+    const results = new Map<unknown, JsonRecord>();
+    let stderr = "";
+    let settled = false;
+
+    const finish = (error?: Error): void => {
+      if (settled) {
+        return;
+      }
+      settled = true;
+      if (error) {
+        reject(error);
+        return;
+      }
+      resolve(ids.map((id) => results.get(id) ?? {}));
     };
 
-    const child = execFile(
-      command[0],
-      command.slice(1),
-      {
-        env: process.env,
-      },
-      (error, stdout, stderr) => {
-        if (error) {
-          reject(new Error(stderr.trim() || error.message));
+    const child = spawn(command[0], command.slice(1), {
+      env: process.env,
+      stdio: ["pipe", "pipe", "pipe"],
+    });
+    child.stdout.setEncoding("utf8");
+    child.stdout.on(
+      "data",
+      createLineReader((line) => {
+        let response: JsonRecord;
+        try {
+          response = JSON.parse(line) as JsonRecord;
+        } catch {
           return;
         }
-        const lines = stdout
-          .split(/\r?\n/)
-          .map((line) => line.trim())
-          .filter(Boolean);
-        for (const line of lines) {
-          try {
-            const response = JSON.parse(line) as JsonRecord;
-            if (response.id === "event-handler") {
-              resolve((response.result as JsonRecord) ?? {});
-              return;
-            }
-          } catch {
-            continue;
-          }
+        results.set(response.id, (response.result as JsonRecord) ?? {});
+        outstanding.delete(response.id);
+        if (outstanding.size === 0) {
+          finish();
         }
-        resolve({});
-      }
+      })
     );
+    child.stderr.setEncoding("utf8");
+    child.stderr.on("data", (chunk: string) => {
+      stderr += chunk;
+    });
+    // An early exit is reported by the close handler below.
+    child.stdin.on("error", () => undefined);
+    child.on("error", (error) => finish(error));
+    child.on("close", (code, signal) => {
+      if (code !== 0) {
+        finish(
+          new Error(stderr.trim() || `MCP command exited (${signal ?? `code ${code}`})`)
+        );
+        return;
+      }
+      finish();
+    });
 
-    child.stdin?.write(JSON.stringify(request));
-    child.stdin?.write("\n");
-    child.stdin?.end();
+    child.stdin.end(calls.map((call, index) => encodeToolCall(ids[index], call)).join(""));
   });
 }
 
-export async function handleQuestion(event: JsonRecord, mcpCommand: MCPCommand): Promise<void> {
+async function runMcp(
+  command: MCPCommand,
+  tool: string,
+  arguments_: JsonRecord
+): Promise<JsonRecord> {
+  const [result] = await runMcpBatch(command, [{ tool, arguments: arguments_ }]);
+  return result;
+}
+
+/** Where handlers send tool calls: a command to spawn per call, or a live session. */
+export type McpTarget = MCPCommand | McpClient;
+
+function hasMcp(mcp: McpTarget): boolean {
+  return mcp instanceof McpClient || mcp.length > 0;
+}
+
+async function callTool(
+  mcp: McpTarget,
+  tool: string,
+  arguments_: JsonRecord
+): Promise<JsonRecord> {
+  if (mcp instanceof McpClient) {
+    const [result] = await mcp.callTools([{ tool, arguments: arguments_ }]);
+    return result;
+  }
+  return runMcp(mcp, tool, arguments_);
+}
+
+export async function handleQuestion(event: JsonRecord, mcp: McpTarget): Promise<void> {
   const jobId = event.job_id ?? "unknown";
   const message = event.message ?? {};
   const content = (message as JsonRecord).content ?? JSON.stringify(message);
@@ -86,30 +144,30 @@ export async function handleQuestion(event: JsonRecord, mcpCommand: MCPCommand):
   console.error(`[QUESTION] Job ${jobId} requires input:`);
   console.error(`  ${content}`);
 
-  if (mcpCommand.length === 0) {
+  if (!hasMcp(mcp)) {
     console.error("  (No MCP command configured - skipping response)");
     return;
   }
 }
 
-export async function handleCompleted(event: JsonRecord, mcpCommand: MCPCommand): Promise<void> {
+export async function handleCompleted(event: JsonRecord, mcp: McpTarget): Promise<void> {
   const jobId = event.job_id ?? "unknown";
   const status = event.status ?? "UNKNOWN";
 
   console.error(`[COMPLETED] Job ${jobId} finished with status: ${status}`);
 
-  if (mcpCommand.length === 0) {
+  if (!hasMcp(mcp)) {
     console.error("  (No MCP command configured - skipping artifact fetch)");
     return;
   }
 
-  const artifacts = await runMcp(mcpCommand, "jules_get_artifacts", {
+  const artifacts = await callTool(mcp, "jules_get_artifacts", {
     job_id: jobId,
   });
   console.error(`  Artifacts: ${JSON.stringify(artifacts, null, 2)}`);
 }
 
-export async function handleError(event: JsonRecord, mcpCommand: MCPCommand): Promise<void> {
+export async function handleError(event: JsonRecord, mcp: McpTarget): Promise<void> {
   const jobId = event.job_id ?? "unknown";
   const status = event.status ?? "UNKNOWN";
   const message = event.message ?? "No error details available";
@@ -117,29 +175,29 @@ export async function handleError(event: JsonRecord, mcpCommand: MCPCommand): Pr
   console.error(`[ERROR] Job ${jobId} failed with status: ${status}`);
   console.error(`  Error: ${message}`);
 
-  if (mcpCommand.length === 0) {
+  if (!hasMcp(mcp)) {
     console.error("  (No MCP command configured - skipping retry)");
     return;
   }
 }
 
-export async function handleStuck(event: JsonRecord, mcpCommand: MCPCommand): Promise<void> {
+export async function handleStuck(event: JsonRecord, mcp: McpTarget): Promise<void> {
   const jobId = event.job_id ?? "unknown";
   const lastActivity = event.last_activity ?? "unknown";
 
   console.error(`[STUCK] Job ${jobId} appears stuck`);
   console.error(`  Last activity: ${lastActivity}`);
 
-  if (mcpCommand.length === 0) {
+  if (!hasMcp(mcp)) {
     console.error("  (No MCP command configured - skipping investigation)");
     return;
   }
 
-  const jobInfo = await runMcp(mcpCommand, "jules_get_job", { job_id: jobId });
+  const jobInfo = await callTool(mcp, "jules_get_job", { job_id: jobId });
   console.error(`  Job info: ${JSON.stringify(jobInfo, null, 2)}`);
 }
 
-function parseMcpCommand(configValue: unknown): MCPCommand {
+export function parseMcpCommand(configValue: unknown): MCPCommand {
   if (Array.isArray(configValue)) {
     return configValue.map(String);
   }
@@ -156,37 +214,34 @@ function formatLog(value: unknown): string {
   return JSON.stringify(value);
 }
 
-async function main(): Promise<number> {
-  const event = await loadEvent();
-  const config = await loadConfig(DEFAULT_CONFIG_PATH);
-  const mcpCommand = parseMcpCommand(config.mcp_command);
+async function handleUnknown(event: JsonRecord): Promise<void> {
+  console.error(`[UNKNOWN] Unhandled event type: ${event.event ?? "unknown"}`);
+  console.error(`  Event data: ${formatLog(event)}`);
+}
+
+const HANDLERS = new Map<string, EventHandler>([
+  ["question", handleQuestion],
+  ["completed", handleCompleted],
+  ["error", handleError],
+  ["stuck", handleStuck],
+]);
 
+/** Route an event to its handler. Shared by the CLI entry point and the watcher. */
+export async function handleEvent(event: JsonRecord, mcp: McpTarget): Promise<void> {
   const eventType = event.event ?? "unknown";
   const jobId = event.job_id ?? "unknown";
   console.error(`--- Processing ${eventType} event for job ${jobId} ---`);
 
-  if (eventType === "question") {
-    await handleQuestion(event, mcpCommand);
-    return 0;
-  }
-
-  if (eventType === "completed") {
-    await handleCompleted(event, mcpCommand);
-    return 0;
-  }
-
-  if (eventType === "error") {
-    await handleError(event, mcpCommand);
-    return 0;
-  }
+  const handler = HANDLERS.get(String(eventType)) ?? handleUnknown;
+  await handler(event, mcp);
+}
 
-  if (eventType === "stuck") {
-    await handleStuck(event, mcpCommand);
-    return 0;
-  }
+async function main(): Promise<number> {
+  const event = await loadEvent();
+  const config = await loadConfig(DEFAULT_CONFIG_PATH);
+  const mcpCommand = parseMcpCommand(config.mcp_command);
 
-  console.error(`[UNKNOWN] Unhandled event type: ${eventType}`);
-  console.error(`  Event data: ${formatLog(event)}`);
+  await handleEvent(event, mcpCommand);
   return 0;
 }
 
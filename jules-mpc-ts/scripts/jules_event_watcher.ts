@@ -1,10 +1,17 @@
 import { spawn } from "child_process";
-import { promises as fs } from "fs";
-import { dirname } from "path";
+import { promises as fs, watch as watchPath, type FSWatcher, type Stats } from "fs";
+import type { FileHandle } from "fs/promises";
+import { basename, dirname } from "path";
+import { fileURLToPath } from "url";
+import { McpClient } from "../src/mcp_client.js";
+import { handleEvent, parseMcpCommand } from "./event_handler.js";
 
 const DEFAULT_CONFIG_PATH = process.env.JULES_CONFIG ?? "jules-manager/config.json";
 const DEFAULT_STATE_PATH = ".watcher_state.json";
 const DEFAULT_POLL_SECONDS = 1;
+const DEFAULT_STATE_FLUSH_SECONDS = 0;
+const NEWLINE = 0x0a;
+const READ_CHUNK_BYTES = 64 * 1024;
 
 type JsonRecord = Record<string, unknown>;
 
@@ -12,11 +19,22 @@ type WatcherState = {
   offset: number;
 };
 
+export type EventDispatcher = {
+  dispatch(event: JsonRecord): Promise<void>;
+  close(): void;
+};
+
+type ChangeWaiter = {
+  wait(timeoutSeconds: number, signal: AbortSignal): Promise<void>;
+  close(): void;
+};
+
 function parseArgs(argv: string[]): {
   events?: string;
   command?: string;
   poll?: number;
   state?: string;
+  stateFlushInterval?: number;
   config?: string;
 } {
   const args: Record<string, string> = {};
@@ -39,6 +57,9 @@ function parseArgs(argv: string[]): {
     command: args.command,
     poll: args.poll ? Number(args.poll) : undefined,
     state: args.state,
+    stateFlushInterval: args["state-flush-interval"]
+      ? Number(args["state-flush-interval"])
+      : undefined,
     config: args.config,
   };
 }
@@ -68,8 +89,17 @@ async function loadConfig(path: string): Promise<JsonRecord> {
 }
 
 async function saveState(path: string, state: WatcherState): Promise<void> {
+  // Write and rename so a crash never leaves a truncated state file.
   await fs.mkdir(dirname(path) || ".", { recursive: true });
-  await fs.writeFile(path, JSON.stringify(state, null, 2), "utf8");
+  const tmpPath = `${path}.tmp`;
+  const handle = await fs.open(tmpPath, "w");
+  try {
+    await handle.writeFile(JSON.stringify(state, null, 2), "utf8");
+    await handle.sync();
+  } finally {
+    await handle.close();
+  }
+  await fs.rename(tmpPath, path);
 }
 
 function runCommand(command: string, event: JsonRecord): Promise<number> {
@@ -86,81 +116,261 @@ function runCommand(command: string, event: JsonRecord): Promise<number> {
   });
 }
 
-async function watch(
+/** Wake on changes to the events file via `fs.watch`, falling back to polling. */
+function createChangeWaiter(path: string): ChangeWaiter {
+  const target = basename(path);
+  let watcher: FSWatcher | undefined;
+  let pending = false;
+  let wake: (() => void) | undefined;
+
+  const arm = (): void => {
+    if (watcher) {
+      return;
+    }
+    try {
+      watcher = watchPath(dirname(path) || ".", (_eventType, filename) => {
+        if (filename && filename.toString() !== target) {
+          return;
+        }
+        pending = true;
+        wake?.();
+      });
+      watcher.on("error", () => {
+        watcher?.close();
+        watcher = undefined;
+        // Changes may have been missed; rescan before waiting again.
+        pending = true;
+        wake?.();
+      });
+      // Rescan once for appends made before the watch existed.
+      pending = true;
+    } catch {
+      watcher = undefined;
+    }
+  };
+  arm();
+
+  return {
+    wait(timeoutSeconds: number, signal: AbortSignal): Promise<void> {
+      arm();
+      if (pending || signal.aborted) {
+        pending = false;
+        return Promise.resolve();
+      }
+      return new Promise((resolve) => {
+        const finish = (): void => {
+          clearTimeout(timer);
+          signal.removeEventListener("abort", finish);
+          wake = undefined;
+          pending = false;
+          resolve();
+        };
+        const timer = setTimeout(finish, timeoutSeconds * 1000);
+        signal.addEventListener("abort", finish);
+        wake = finish;
+      });
+    },
+    close(): void {
+      watcher?.close();
+      watcher = undefined;
+    },
+  };
+}
+
+function commandDispatcher(command: string): EventDispatcher {
+  return {
+    async dispatch(event) {
+      const exitCode = await runCommand(command, event);
+      if (exitCode !== 0) {
+        console.error(`Handler returned exit code ${exitCode}`);
+      }
+    },
+    close() {},
+  };
+}
+
+/**
+ * Handle events in this process, sending tool calls to one MCP server that is
+ * kept running across events (and restarted if it exits).
+ */
+function inProcessDispatcher(mcpCommand: string[]): EventDispatcher {
+  let session: McpClient | null = null;
+  return {
+    async dispatch(event) {
+      if (mcpCommand.length > 0 && (!session || session.exited)) {
+        session = new McpClient(mcpCommand, "jules-event-watcher");
+      }
+      try {
+        await handleEvent(event, session ?? mcpCommand);
+      } catch (error) {
+        console.error(`Handler failed: ${(error as Error).message}`);
+      }
+    },
+    close() {
+      session?.close();
+      session = null;
+    },
+  };
+}
+
+async function openEventsFile(path: string): Promise<FileHandle | null> {
+  try {
+    return await fs.open(path, "r");
+  } catch (error) {
+    if ((error as NodeJS.ErrnoException).code === "ENOENT") {
+      return null;
+    }
+    throw error;
+  }
+}
+
+async function wasReplaced(path: string, current: Stats): Promise<boolean> {
+  try {
+    const latest = await fs.stat(path);
+    return latest.ino !== current.ino || latest.dev !== current.dev;
+  } catch (error) {
+    if ((error as NodeJS.ErrnoException).code === "ENOENT") {
+      return true;
+    }
+    throw error;
+  }
+}
+
+function parseEvent(chunk: Buffer, start: number, end: number): JsonRecord | null {
+  const line = chunk.toString("utf8", start, end).trim();
+  if (!line) {
+    return null;
+  }
+  try {
+    return JSON.parse(line) as JsonRecord;
+  } catch {
+    return null;
+  }
+}
+
+/**
+ * Tail `eventsPath` and dispatch each complete JSON line, persisting the read
+ * offset to `statePath`, until `signal` is aborted.
+ */
+export async function watch(
   eventsPath: string,
-  command: string,
+  dispatcher: EventDispatcher,
+  handlerName: string,
   pollSeconds: number,
-  statePath: string
+  statePath: string,
+  stateFlushSeconds: number,
+  signal: AbortSignal
 ): Promise<void> {
   let state = await loadState(statePath);
+  let persistedOffset = state.offset;
+  let persistedAt = 0;
+
+  // The state only holds the read offset, so it is written when the offset
+  // moved, and at most once per stateFlushSeconds.
+  const persistState = async (force = false): Promise<void> => {
+    if (state.offset === persistedOffset) {
+      return;
+    }
+    const now = Date.now();
+    if (!force && now - persistedAt < stateFlushSeconds * 1000) {
+      return;
+    }
+    await saveState(statePath, state);
+    persistedOffset = state.offset;
+    persistedAt = now;
+  };
+  const changes = createChangeWaiter(eventsPath);
   console.error("Event Watcher started");
   console.error(`Events: ${eventsPath}`);
-  console.error(`Handler: ${command}`);
+  console.error(`Handler: ${handlerName}`);
 
-  while (true) {
-    try {
-      const stat = await fs.stat(eventsPath).catch((error) => {
-        if ((error as NodeJS.ErrnoException).code === "ENOENT") {
-          return null;
-        }
-        throw error;
-      });
+  let handle: FileHandle | null = null;
+  const readBuffer = Buffer.allocUnsafe(READ_CHUNK_BYTES);
+  // Bytes of an unfinished last line that were read but not consumed yet.
+  // They sit between state.offset and the next read position.
+  let partial = Buffer.alloc(0);
 
-      if (!stat) {
-        await new Promise((resolve) => setTimeout(resolve, pollSeconds * 1000));
+  while (!signal.aborted) {
+    try {
+      handle ??= await openEventsFile(eventsPath);
+      if (!handle) {
+        await changes.wait(pollSeconds, signal);
         continue;
       }
 
-      if (stat.size < state.offset) {
+      const stat = await handle.stat();
+      if (stat.size < state.offset + partial.length) {
         state = { offset: 0 };
+        partial = Buffer.alloc(0);
       }
 
-      if (stat.size === state.offset) {
-        await new Promise((resolve) => setTimeout(resolve, pollSeconds * 1000));
-        await saveState(statePath, state);
+      if (stat.size === state.offset + partial.length) {
+        // Nothing new on the open descriptor. Before going idle make sure the
+        // path still points at the same file, otherwise reopen it from the start.
+        if (await wasReplaced(eventsPath, stat)) {
+          await handle.close();
+          handle = null;
+          state = { offset: 0 };
+          partial = Buffer.alloc(0);
+          continue;
+        }
+        await changes.wait(pollSeconds, signal);
+        await persistState();
         continue;
       }
 
-      const handle = await fs.open(eventsPath, "r");
-      try {
-        const remaining = Math.max(stat.size - state.offset, 0);
-        if (remaining === 0) {
-          state = { offset: stat.size };
-          continue;
+      // Read the new bytes in fixed-size chunks into one reused buffer. Only
+      // complete lines are consumed; a trailing partial line is carried over
+      // in memory and completed by a later read.
+      let position = state.offset + partial.length;
+      while (position < stat.size && !signal.aborted) {
+        const { bytesRead } = await handle.read(
+          readBuffer,
+          0,
+          Math.min(readBuffer.length, stat.size - position),
+          position
+        );
+        if (bytesRead === 0) {
+          break;
         }
-        const buffer = Buffer.alloc(remaining);
-        await handle.read(buffer, 0, buffer.length, state.offset);
-        const chunk = buffer.toString("utf8");
-        const lines = chunk.split(/\r?\n/).filter((line) => line.trim());
-        for (const line of lines) {
-          let event: JsonRecord | null = null;
-          try {
-            event = JSON.parse(line) as JsonRecord;
-          } catch (error) {
-            event = null;
-          }
+        position += bytesRead;
+        const fresh = readBuffer.subarray(0, bytesRead);
+        const chunk = partial.length > 0 ? Buffer.concat([partial, fresh]) : fresh;
+
+        let start = 0;
+        let newline = chunk.indexOf(NEWLINE, partial.length);
+        while (newline !== -1 && !signal.aborted) {
+          const event = parseEvent(chunk, start, newline);
+          start = newline + 1;
+          newline = chunk.indexOf(NEWLINE, start);
           if (!event) {
             continue;
           }
           const eventType = event.event ?? "unknown";
           const jobId = event.job_id ?? "unknown";
           console.error(`Processing ${eventType} event for job ${jobId}`);
-          const exitCode = await runCommand(command, event);
-          if (exitCode !== 0) {
-            console.error(`Handler returned exit code ${exitCode}`);
-          }
+          await dispatcher.dispatch(event);
         }
-        state = { offset: stat.size };
-      } finally {
-        await handle.close();
+        state = { offset: state.offset + start };
+        // readBuffer is overwritten by the next read, so copy the tail out.
+        partial = Buffer.from(chunk.subarray(start));
       }
     } catch (error) {
       console.error(`Error reading events file: ${(error as Error).message}`);
+      await handle?.close().catch(() => undefined);
+      handle = null;
+      partial = Buffer.alloc(0);
     }
 
-    await saveState(statePath, state);
-    await new Promise((resolve) => setTimeout(resolve, pollSeconds * 1000));
+    await persistState();
+    await changes.wait(pollSeconds, signal);
   }
+
+  console.error("Event Watcher stopping");
+  await persistState(true);
+  await handle?.close().catch(() => undefined);
+  changes.close();
+  dispatcher.close();
 }
 
 async function main(): Promise<number> {
@@ -175,22 +385,52 @@ async function main(): Promise<number> {
     DEFAULT_POLL_SECONDS;
   const statePath =
     args.state ?? (config.watcher_state_path as string | undefined) ?? DEFAULT_STATE_PATH;
+  const stateFlushSeconds =
+    args.stateFlushInterval ??
+    (config.watcher_state_flush_seconds as number | undefined) ??
+    DEFAULT_STATE_FLUSH_SECONDS;
 
   if (!eventsPath) {
     console.error("Error: events_path must be provided via --events or config");
     return 1;
   }
 
-  if (!command) {
-    console.error("Error: --command is required");
-    return 1;
+  // Stop after the event being handled, flushing state, on SIGINT/SIGTERM.
+  const shutdown = new AbortController();
+  for (const signalName of ["SIGINT", "SIGTERM"] as const) {
+    process.once(signalName, () => shutdown.abort());
   }
 
-  await watch(eventsPath, command, pollSeconds, statePath);
+  // Without --command events are handled in-process, reusing one MCP server
+  // process; --command keeps the spawn-per-event behaviour.
+  if (command) {
+    await watch(
+      eventsPath,
+      commandDispatcher(command),
+      command,
+      pollSeconds,
+      statePath,
+      stateFlushSeconds,
+      shutdown.signal
+    );
+  } else {
+    const mcpCommand = parseMcpCommand(config.mcp_command);
+    await watch(
+      eventsPath,
+      inProcessDispatcher(mcpCommand),
+      `in-process (MCP: ${mcpCommand.join(" ") || "none"})`,
+      pollSeconds,
+      statePath,
+      stateFlushSeconds,
+      shutdown.signal
+    );
+  }
   return 0;
 }
 
-main().catch((error) => {
-  console.error("Fatal error in event watcher:", error);
-  process.exit(1);
-});
+if (process.argv[1] === fileURLToPath(import.meta.url)) {
+  main().catch((error) => {
+    console.error("Fatal error in event watcher:", error);
+    process.exit(1);
+  });
+}
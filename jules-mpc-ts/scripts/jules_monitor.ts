@@ -1,21 +1,45 @@
 import { promises as fs } from "fs";
+import type { FileHandle } from "fs/promises";
 import { dirname } from "path";
 import { fileURLToPath } from "url";
 
 const DEFAULT_API_BASE = "https://jules.googleapis.com/v1alpha";
 const DEFAULT_POLL_SECONDS = 45;
 const DEFAULT_STUCK_MINUTES = 20;
+const DEFAULT_CONCURRENCY = 8;
 const DEFAULT_STATE_PATH = ".monitor_state.json";
 const DEFAULT_CONFIG_PATH = process.env.JULES_CONFIG ?? "jules-manager/config.json";
+const BACKOFF_FACTOR = 1.5;
+const MAX_BACKOFF_SECONDS = 600;
 
 const ACTIONABLE_STATUSES = new Set(["COMPLETED", "FAILED"]);
 
 type JsonRecord = Record<string, unknown>;
 
+type MonitorOptions = {
+  /** Skip jobs that are not due yet. */
+  schedule?: PollSchedule;
+  /** Maximum number of jobs polled at the same time. */
+  concurrency?: number;
+};
+
+/** Whether a poll changed the job's state, and a marker for its newest activity. */
+type PollResult = {
+  changed: boolean;
+  activity?: string;
+};
+
+type OpenEventsFile = {
+  handle: FileHandle;
+  ino: number;
+  dev: number;
+};
+
 type JobState = {
   cursor?: string;
   last_status?: string;
   last_activity?: string;
+  etag?: string;
 };
 
 function utcNow(): string {
@@ -38,14 +62,141 @@ async function loadConfig(path: string): Promise<JsonRecord> {
   return loadJson<JsonRecord>(path, {});
 }
 
-async function saveJson(path: string, payload: unknown): Promise<void> {
-  await fs.mkdir(dirname(path) || ".", { recursive: true });
-  await fs.writeFile(path, JSON.stringify(payload, null, 2), "utf8");
+export async function saveJson(path: string, payload: unknown, pretty = false): Promise<void> {
+  // Write and rename so a crash keeps the previous state.
+  const tmpPath = `${path}.tmp`;
+  const handle = await fs.open(tmpPath, "w");
+  try {
+    await handle.writeFile(JSON.stringify(payload, null, pretty ? 2 : undefined), "utf8");
+    await handle.sync();
+  } finally {
+    await handle.close();
+  }
+  await fs.rename(tmpPath, path);
+}
+
+/** Append-only writer that keeps the events file open and reopens it after rotation. */
+export class EventLog {
+  private readonly path: string;
+  private file: Promise<OpenEventsFile> | null = null;
+
+  constructor(path: string) {
+    this.path = path;
+  }
+
+  async append(payload: JsonRecord): Promise<void> {
+    await this.appendAll([payload]);
+  }
+
+  async appendAll(payloads: JsonRecord[]): Promise<void> {
+    if (payloads.length === 0) {
+      return;
+    }
+    const { handle } = await this.current();
+    await handle.write(payloads.map((payload) => `${JSON.stringify(payload)}\n`).join(""));
+  }
+
+  async close(): Promise<void> {
+    const file = this.file;
+    this.file = null;
+    await (await file)?.handle.close();
+  }
+
+  private async current(): Promise<OpenEventsFile> {
+    const pending = this.file;
+    if (pending) {
+      const file = await pending;
+      if (!(await this.wasReplaced(file))) {
+        return file;
+      }
+      if (this.file === pending) {
+        this.file = null;
+        await file.handle.close().catch(() => undefined);
+      }
+    }
+    return this.open();
+  }
+
+  private async wasReplaced(file: OpenEventsFile): Promise<boolean> {
+    try {
+      const latest = await fs.stat(this.path);
+      return latest.ino !== file.ino || latest.dev !== file.dev;
+    } catch (error) {
+      if ((error as NodeJS.ErrnoException).code === "ENOENT") {
+        return true;
+      }
+      throw error;
+    }
+  }
+
+  private open(): Promise<OpenEventsFile> {
+    if (!this.file) {
+      // Concurrent appends share one open; a failed open is retried next time.
+      const opening = fs
+        .mkdir(dirname(this.path) || ".", { recursive: true })
+        .then(() => fs.open(this.path, "a"))
+        .then(async (handle) => {
+          try {
+            const { ino, dev } = await handle.stat();
+            return { handle, ino, dev };
+          } catch (error) {
+            await handle.close().catch(() => undefined);
+            throw error;
+          }
+        });
+      opening.catch(() => {
+        if (this.file === opening) {
+          this.file = null;
+        }
+      });
+      this.file = opening;
+    }
+    return this.file;
+  }
+}
+
+/** Per-job poll intervals that back off while a job is neither changing nor active. */
+export class PollSchedule {
+  private readonly baseSeconds: number;
+  private readonly entries = new Map<
+    string,
+    { backoffSeconds: number; nextDue: number; activity?: string }
+  >();
+
+  constructor(baseSeconds: number) {
+    this.baseSeconds = baseSeconds;
+  }
+
+  isDue(sessionId: string, now = monotonicSeconds()): boolean {
+    const entry = this.entries.get(sessionId);
+    return !entry || now >= entry.nextDue;
+  }
+
+  record(sessionId: string, result: PollResult, now = monotonicSeconds()): void {
+    const entry = this.entries.get(sessionId);
+    const activity = result.activity ?? entry?.activity;
+    const newActivity = entry !== undefined && activity !== entry.activity;
+    const previous = entry?.backoffSeconds ?? this.baseSeconds;
+    const backoffSeconds =
+      result.changed || newActivity
+        ? this.baseSeconds
+        : Math.min(previous * BACKOFF_FACTOR, Math.max(MAX_BACKOFF_SECONDS, this.baseSeconds));
+    this.entries.set(sessionId, { backoffSeconds, nextDue: now + backoffSeconds, activity });
+  }
+
+  /** Seconds until the first of the given jobs is due, at most the base interval. */
+  secondsUntilDue(sessionIds: Iterable<string>, now = monotonicSeconds()): number {
+    let wait = this.baseSeconds;
+    for (const sessionId of sessionIds) {
+      const entry = this.entries.get(sessionId);
+      wait = Math.min(wait, entry ? entry.nextDue - now : 0);
+    }
+    return Math.max(wait, 0);
+  }
 }
 
-async function appendJsonl(path: string, payload: JsonRecord): Promise<void> {
-  await fs.mkdir(dirname(path) || ".", { recursive: true });
-  await fs.appendFile(path, `${JSON.stringify(payload)}\n`, "utf8");
+function monotonicSeconds(): number {
+  return performance.now() / 1000;
 }
 
 async function loadJobs(path: string): Promise<JsonRecord[]> {
@@ -74,6 +225,34 @@ async function loadJobs(path: string): Promise<JsonRecord[]> {
   }
 }
 
+/** Load the jobs file, re-parsing it only when its mtime or size changed. */
+export function createJobsLoader(path: string): () => Promise<JsonRecord[]> {
+  let cachedMtimeMs: number | null = null;
+  let cachedSize: number | null = null;
+  let jobs: JsonRecord[] = [];
+
+  return async () => {
+    let stat;
+    try {
+      stat = await fs.stat(path);
+    } catch (error) {
+      if ((error as NodeJS.ErrnoException).code === "ENOENT") {
+        cachedMtimeMs = null;
+        cachedSize = null;
+        jobs = [];
+        return jobs;
+      }
+      throw error;
+    }
+    if (stat.mtimeMs !== cachedMtimeMs || stat.size !== cachedSize) {
+      jobs = await loadJobs(path);
+      cachedMtimeMs = stat.mtimeMs;
+      cachedSize = stat.size;
+    }
+    return jobs;
+  };
+}
+
 export function buildHeaders(apiKey?: string | null): HeadersInit {
   const headers: HeadersInit = { Accept: "application/json" };
   if (apiKey) {
@@ -82,8 +261,29 @@ export function buildHeaders(apiKey?: string | null): HeadersInit {
   return headers;
 }
 
-async function fetchJson(url: string, apiKey?: string | null): Promise<JsonRecord> {
-  const response = await fetch(url, { headers: buildHeaders(apiKey) });
+async function fetchJson(url: string, headers: HeadersInit): Promise<JsonRecord> {
+  return readJson(await fetch(url, { headers }), url);
+}
+
+/** GET with If-None-Match when an ETag is known; resolves to null on 304. */
+async function fetchJsonIfChanged(
+  url: string,
+  headers: HeadersInit,
+  etag?: string
+): Promise<{ payload: JsonRecord; etag?: string } | null> {
+  const response = await fetch(url, {
+    headers: etag
+      ? { ...(headers as Record<string, string>), "If-None-Match": etag }
+      : headers,
+  });
+  if (response.status === 304) {
+    return null;
+  }
+  const payload = await readJson(response, url);
+  return { payload, etag: response.headers.get("ETag") ?? undefined };
+}
+
+async function readJson(response: Response, url: string): Promise<JsonRecord> {
   if (!response.ok) {
     const detail = await response.text();
     throw new Error(`HTTP ${response.status} for ${url}: ${detail}`);
@@ -113,10 +313,8 @@ export function isQuestionActivity(activity: JsonRecord): boolean {
   if (!agentMessaged) {
     return false;
   }
-  const text = String(
-    (agentMessaged as JsonRecord).agentMessage ?? ""
-  ).toLowerCase();
-  return text.includes("?");
+  // Only "?" is checked, so the (possibly long) message is not lowercased.
+  return String(agentMessaged.agentMessage ?? "").includes("?");
 }
 
 export function findActionableActivity(activities: JsonRecord[]): JsonRecord | undefined {
@@ -124,13 +322,14 @@ export function findActionableActivity(activities: JsonRecord[]): JsonRecord | u
 }
 
 export function shouldEmitStuck(
-  lastActivity: string | undefined,
+  lastActivity: string | number | undefined,
   thresholdMinutes: number
 ): boolean {
-  if (!lastActivity) {
+  if (lastActivity === undefined || lastActivity === "") {
     return false;
   }
-  const last = Date.parse(lastActivity);
+  const last =
+    typeof lastActivity === "number" ? lastActivity : Date.parse(lastActivity);
   if (Number.isNaN(last)) {
     return false;
   }
@@ -138,107 +337,241 @@ export function shouldEmitStuck(
   return delta >= thresholdMinutes * 60 * 1000;
 }
 
-export async function monitorOnce(
-  jobs: JsonRecord[],
+// Parsed last_activity per job state, so the ISO string is parsed once.
+const activityTimes = new WeakMap<JobState, { iso: string; ms: number }>();
+
+function markActivity(jobState: JobState): void {
+  const ms = Date.now();
+  const iso = new Date(ms).toISOString();
+  jobState.last_activity = iso;
+  activityTimes.set(jobState, { iso, ms });
+}
+
+function lastActivityMs(jobState: JobState): number | undefined {
+  const iso = jobState.last_activity;
+  if (!iso) {
+    return undefined;
+  }
+  const cached = activityTimes.get(jobState);
+  if (cached?.iso === iso) {
+    return cached.ms;
+  }
+  const ms = Date.parse(iso);
+  activityTimes.set(jobState, { iso, ms });
+  return ms;
+}
+
+/** Marker for the newest activity in a page. */
+function activityMarker(activities: JsonRecord[]): string | undefined {
+  const latest = activities[activities.length - 1];
+  if (!latest) {
+    return undefined;
+  }
+  const key = latest.id ?? latest.name ?? latest.createTime ?? "";
+  return `${activities.length}:${String(key)}`;
+}
+
+async function pollJob(
+  job: JsonRecord,
   state: Record<string, JobState>,
   apiBase: string,
-  apiKey: string | undefined,
-  eventsPath: string,
+  headers: HeadersInit,
+  events: JsonRecord[],
   stuckMinutes: number
-): Promise<void> {
-  for (const job of jobs) {
-    const sessionId = String(job.session_id ?? "");
-    if (!sessionId) {
-      continue;
-    }
+): Promise<PollResult> {
+  const sessionId = String(job.session_id ?? "");
+  if (!sessionId) {
+    return { changed: false };
+  }
 
-    const jobState = (state[sessionId] ??= {});
+  let changed = !(sessionId in state);
+  const jobState = (state[sessionId] ??= {});
 
-    let statusPayload: JsonRecord;
-    try {
-      statusPayload = await fetchJson(sessionStatusUrl(apiBase, sessionId), apiKey);
-    } catch (error) {
-      await appendJsonl(eventsPath, {
-        event: "error",
-        session_id: sessionId,
-        observed_at: utcNow(),
-        message: (error as Error).message,
-      });
-      continue;
-    }
+  let status: { payload: JsonRecord; etag?: string } | null;
+  try {
+    status = await fetchJsonIfChanged(
+      sessionStatusUrl(apiBase, sessionId),
+      headers,
+      jobState.etag
+    );
+  } catch (error) {
+    events.push({
+      event: "error",
+      session_id: sessionId,
+      observed_at: utcNow(),
+      message: (error as Error).message,
+    });
+    return { changed };
+  }
 
-    const sessionState = statusPayload.state ? String(statusPayload.state) : undefined;
-    if (sessionState && sessionState !== jobState.last_status) {
-      jobState.last_status = sessionState;
-      jobState.last_activity = utcNow();
+  if (!status) {
+    // Not modified: finished and waiting sessions were already reported.
+    const lastStatus = jobState.last_status;
+    if (
+      lastStatus &&
+      (ACTIONABLE_STATUSES.has(lastStatus) || lastStatus === "AWAITING_USER_FEEDBACK")
+    ) {
+      return { changed };
     }
+  }
 
-    if (sessionState && ACTIONABLE_STATUSES.has(sessionState)) {
-      await appendJsonl(eventsPath, {
-        event: sessionState === "COMPLETED" ? "completed" : "error",
-        session_id: sessionId,
-        state: sessionState,
-        observed_at: utcNow(),
-        payload: statusPayload,
-      });
-      continue;
-    }
+  const statusPayload = status?.payload ?? {};
+  if (status && status.etag !== jobState.etag) {
+    jobState.etag = status.etag;
+    changed = true;
+  }
 
-    if (sessionState === "AWAITING_USER_FEEDBACK") {
-      await appendJsonl(eventsPath, {
-        event: "question",
-        session_id: sessionId,
-        state: sessionState,
-        observed_at: utcNow(),
-        payload: statusPayload,
-      });
-      jobState.last_activity = utcNow();
-      continue;
-    }
+  const sessionState = statusPayload.state ? String(statusPayload.state) : undefined;
+  if (sessionState && sessionState !== jobState.last_status) {
+    jobState.last_status = sessionState;
+    markActivity(jobState);
+    changed = true;
+  }
 
-    let activitiesPayload: JsonRecord = {};
-    try {
-      activitiesPayload = await fetchJson(
-        sessionActivitiesUrl(apiBase, sessionId, jobState.cursor),
-        apiKey
-      );
-    } catch (error) {
-      activitiesPayload = {};
-    }
+  if (sessionState && ACTIONABLE_STATUSES.has(sessionState)) {
+    events.push({
+      event: sessionState === "COMPLETED" ? "completed" : "error",
+      session_id: sessionId,
+      state: sessionState,
+      observed_at: utcNow(),
+      payload: statusPayload,
+    });
+    return { changed };
+  }
 
-    const nextPageToken = activitiesPayload.nextPageToken
-      ? String(activitiesPayload.nextPageToken)
-      : undefined;
-    const activities = Array.isArray(activitiesPayload.activities)
-      ? (activitiesPayload.activities as JsonRecord[])
-      : [];
-    const actionableActivity = findActionableActivity(activities);
+  if (sessionState === "AWAITING_USER_FEEDBACK") {
+    events.push({
+      event: "question",
+      session_id: sessionId,
+      state: sessionState,
+      observed_at: utcNow(),
+      payload: statusPayload,
+    });
+    markActivity(jobState);
+    return { changed: true };
+  }
 
-    if (nextPageToken) {
-      jobState.cursor = nextPageToken;
-    }
+  let activitiesPayload: JsonRecord = {};
+  try {
+    activitiesPayload = await fetchJson(
+      sessionActivitiesUrl(apiBase, sessionId, jobState.cursor),
+      headers
+    );
+  } catch (error) {
+    activitiesPayload = {};
+  }
 
-    if (actionableActivity) {
-      await appendJsonl(eventsPath, {
-        event: "question",
-        session_id: sessionId,
-        observed_at: utcNow(),
-        activity: actionableActivity,
-      });
-      jobState.last_activity = utcNow();
-      continue;
+  const nextPageToken = activitiesPayload.nextPageToken
+    ? String(activitiesPayload.nextPageToken)
+    : undefined;
+  const activities = Array.isArray(activitiesPayload.activities)
+    ? (activitiesPayload.activities as JsonRecord[])
+    : [];
+  const actionableActivity = findActionableActivity(activities);
+
+  const activity = activityMarker(activities);
+
+  if (nextPageToken && nextPageToken !== jobState.cursor) {
+    jobState.cursor = nextPageToken;
+    changed = true;
+  }
+
+  if (actionableActivity) {
+    events.push({
+      event: "question",
+      session_id: sessionId,
+      observed_at: utcNow(),
+      activity: actionableActivity,
+    });
+    markActivity(jobState);
+    return { changed: true, activity };
+  }
+
+  if (shouldEmitStuck(lastActivityMs(jobState), stuckMinutes)) {
+    events.push({
+      event: "stuck",
+      session_id: sessionId,
+      observed_at: utcNow(),
+      last_activity: jobState.last_activity ?? null,
+    });
+    markActivity(jobState);
+    return { changed: true, activity };
+  }
+  return { changed, activity };
+}
+
+/** Promise.allSettled over `items` with at most `limit` tasks in flight. */
+async function settleWithConcurrency<T, R>(
+  items: T[],
+  limit: number,
+  task: (item: T, index: number) => Promise<R>
+): Promise<PromiseSettledResult<R>[]> {
+  const results: PromiseSettledResult<R>[] = new Array(items.length);
+  let next = 0;
+  const worker = async (): Promise<void> => {
+    while (next < items.length) {
+      const index = next;
+      next += 1;
+      try {
+        results[index] = { status: "fulfilled", value: await task(items[index], index) };
+      } catch (reason) {
+        results[index] = { status: "rejected", reason };
+      }
     }
+  };
+  const workers = Math.min(Math.max(1, Math.floor(limit) || 1), items.length);
+  await Promise.all(Array.from({ length: workers }, worker));
+  return results;
+}
 
-    if (shouldEmitStuck(jobState.last_activity, stuckMinutes)) {
-      await appendJsonl(eventsPath, {
-        event: "stuck",
-        session_id: sessionId,
-        observed_at: utcNow(),
-        last_activity: jobState.last_activity ?? null,
-      });
-      jobState.last_activity = utcNow();
+/** Poll every due job once and resolve to whether any job's state changed. */
+export async function monitorOnce(
+  jobs: JsonRecord[],
+  state: Record<string, JobState>,
+  apiBase: string,
+  apiKey: string | undefined,
+  events: EventLog,
+  stuckMinutes: number,
+  options: MonitorOptions = {}
+): Promise<boolean> {
+  const { schedule, concurrency = DEFAULT_CONCURRENCY } = options;
+  const headers = buildHeaders(apiKey);
+  const jobEvents = jobs.map((): JsonRecord[] => []);
+  const results = await settleWithConcurrency(
+    jobs,
+    concurrency,
+    async (job, index) => {
+      const sessionId = String(job.session_id ?? "");
+      if (schedule && !schedule.isDue(sessionId)) {
+        return false;
+      }
+      let result: PollResult = { changed: false };
+      try {
+        result = await pollJob(
+          job,
+          state,
+          apiBase,
+          headers,
+          jobEvents[index],
+          stuckMinutes
+        );
+        return result.changed;
+      } finally {
+        // A failed poll is rescheduled too, so it cannot be retried in a tight loop.
+        schedule?.record(sessionId, result);
+      }
     }
+  );
+  await events.appendAll(jobEvents.flat());
+  const failure = results.find(
+    (result): result is PromiseRejectedResult => result.status === "rejected"
+  );
+  if (failure) {
+    throw failure.reason;
   }
+  return results.some(
+    (result) => result.status === "fulfilled" && result.value
+  );
 }
 
 function parseArgs(argv: string[]): {
@@ -247,6 +580,8 @@ function parseArgs(argv: string[]): {
   state?: string;
   poll?: number;
   stuckMinutes?: number;
+  concurrency?: number;
+  prettyState?: boolean;
   apiBase?: string;
   config?: string;
 } {
@@ -274,6 +609,8 @@ function parseArgs(argv: string[]): {
     stuckMinutes: args["stuck-minutes"]
       ? Number(args["stuck-minutes"])
       : undefined,
+    concurrency: args.concurrency ? Number(args.concurrency) : undefined,
+    prettyState: args["pretty-state"] ? args["pretty-state"] === "true" : undefined,
     apiBase: args["api-base"],
     config: args.config,
   };
@@ -304,27 +641,48 @@ async function main(): Promise<number> {
     args.stuckMinutes ??
     (config.stuck_minutes as number | undefined) ??
     DEFAULT_STUCK_MINUTES;
+  const concurrency =
+    args.concurrency ??
+    (config.monitor_concurrency as number | undefined) ??
+    DEFAULT_CONCURRENCY;
+  const prettyState =
+    args.prettyState ?? (config.monitor_pretty_state as boolean | undefined) ?? false;
 
   if (!jobsPath || !eventsPath) {
     console.error("Error: jobs_path and events_path must be provided");
     return 1;
   }
 
+  const events = new EventLog(eventsPath);
+  const loadCurrentJobs = createJobsLoader(jobsPath);
   const stateRaw = await loadJson<Record<string, JobState>>(statePath, {});
   const state: Record<string, JobState> = { ...stateRaw };
+  await fs.mkdir(dirname(statePath) || ".", { recursive: true });
+  let stateDirty = false;
+  const schedule = new PollSchedule(pollSeconds);
 
   console.error(`Jules Monitor started - polling every ${pollSeconds}s`);
   console.error(`Jobs: ${jobsPath}`);
   console.error(`Events: ${eventsPath}`);
 
   while (true) {
+    let jobs: JsonRecord[] = [];
     try {
-      const jobs = await loadJobs(jobsPath);
+      jobs = await loadCurrentJobs();
       if (jobs.length > 0) {
-        await monitorOnce(jobs, state, apiBase, apiKey, eventsPath, stuckMinutes);
+        if (
+          await monitorOnce(jobs, state, apiBase, apiKey, events, stuckMinutes, {
+            schedule,
+            concurrency,
+          })
+        ) {
+          stateDirty = true;
+        }
       }
     } catch (error) {
-      await appendJsonl(eventsPath, {
+      // Some jobs may have updated their state before the failure.
+      stateDirty = true;
+      await events.append({
         event: "error",
         session_id: null,
         observed_at: utcNow(),
@@ -332,8 +690,13 @@ async function main(): Promise<number> {
       });
     }
 
-    await saveJson(statePath, state);
-    await sleep(pollSeconds);
+    if (stateDirty) {
+      await saveJson(statePath, state, prettyState);
+      stateDirty = false;
+    }
+    await sleep(
+      schedule.secondsUntilDue(jobs.map((job) => String(job.session_id ?? "")))
+    );
   }
 }
 
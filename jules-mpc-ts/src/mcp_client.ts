@@ -1,4 +1,60 @@
-import { execFile } from "child_process";
+import { spawn, type ChildProcessByStdio } from "child_process";
+import type { Readable, Writable } from "stream";
+import { fileURLToPath } from "url";
+
+type JsonRecord = Record<string, unknown>;
+
+// Everything in a tools/call request except the id, tool name and arguments
+// is constant, so that part of the envelope is serialized once.
+const TOOL_CALL_PREFIX = '{"jsonrpc":"2.0","method":"tools/call","id":';
+
+type PendingRequest = {
+  resolve: (result: JsonRecord) => void;
+  reject: (error: Error) => void;
+};
+
+export type McpToolCall = {
+  tool: string;
+  arguments: JsonRecord;
+};
+
+function encodeMessage(message: JsonRecord): string {
+  return `${JSON.stringify(message)}\n`;
+}
+
+export function encodeToolCall(id: string, call: McpToolCall): string {
+  return (
+    `${TOOL_CALL_PREFIX}${JSON.stringify(id)},"params":{"name":${JSON.stringify(call.tool)},` +
+    `"arguments":${JSON.stringify(call.arguments)}}}\n`
+  );
+}
+
+/**
+ * Split a stream of text chunks into trimmed, non-empty lines.
+ *
+ * Large responses arrive in many chunks; only the new part of the buffer is
+ * scanned for a line break, and the buffer is cut once per chunk rather than
+ * per line.
+ */
+export function createLineReader(onLine: (line: string) => void): (chunk: string) => void {
+  let buffer = "";
+  let scanFrom = 0;
+  return (chunk: string) => {
+    buffer += chunk;
+    let start = 0;
+    let newline = buffer.indexOf("\n", scanFrom);
+    while (newline !== -1) {
+      const line = buffer.slice(start, newline).trim();
+      start = newline + 1;
+      newline = buffer.indexOf("\n", start);
+      if (line) {
+        onLine(line);
+      }
+    }
+    buffer = buffer.slice(start);
+    scanFrom = buffer.length;
+  };
+}
 
 function parseArgs(argv: string[]): {
   command?: string[];
@@ -41,58 +97,113 @@ function parseArgs(argv: string[]): {
   };
 }
 
-function callTool(
-  command: string[],
-  tool: string,
-  arguments_: Record<string, unknown>
-): Promise<Record<string, unknown>> {
-  return new Promise((resolve, reject) => {
-    const request = {
-      jsonrpc: "2.0",
-      id: "mcp-client",
-      method: "tools/call",
-      params: { name: tool, arguments: arguments_ },
-    };
-
-    const child = execFile(
-      command[0],
-      command.slice(1),
-      {
-        env: process.env,
-      },
-      (error, stdout, stderr) => {
-        if (error) {
-          reject(new Error(stderr.trim() || error.message));
-          return;
-        }
-
-        const lines = stdout
-          .split(/\r?\n/)
-          .map((line) => line.trim())
-          .filter(Boolean);
-        for (const line of lines) {
-          try {
-            const response = JSON.parse(line) as Record<string, unknown>;
-            if (response.id === "mcp-client") {
-              if (response.error) {
-                reject(new Error(`MCP error: ${JSON.stringify(response.error)}`));
-                return;
-              }
-              resolve((response.result as Record<string, unknown>) ?? {});
-              return;
-            }
-          } catch {
-            continue;
-          }
-        }
-        resolve({});
-      }
+/**
+ * A long-lived MCP server process.
+ *
+ * The server is spawned and initialized once; every subsequent tool call is
+ * a single JSON-RPC line over the open stdio pipe, so no process is forked
+ * per call. Requests get unique ids and may be in flight concurrently.
+ */
+export class McpClient {
+  private readonly child: ChildProcessByStdio<Writable, Readable, null>;
+  private readonly pending = new Map<string, PendingRequest>();
+  private readonly ready: Promise<void>;
+  private nextId = 0;
+  private exitError: Error | null = null;
+
+  constructor(command: string[], clientName = "jules-mcp-client") {
+    this.child = spawn(command[0], command.slice(1), {
+      env: process.env,
+      stdio: ["pipe", "pipe", "inherit"],
+    });
+    this.child.stdout.setEncoding("utf8");
+    this.child.stdout.on("data", createLineReader((line) => this.onMessage(line)));
+    // A write after the server died fails with EPIPE; the exit handler
+    // already rejects every pending request.
+    this.child.stdin.on("error", () => undefined);
+    this.child.on("error", (error) => this.onExit(error));
+    this.child.on("exit", (code, signal) =>
+      this.onExit(new Error(`MCP server exited (${signal ?? `code ${code}`})`))
     );
 
-    child.stdin?.write(JSON.stringify(request));
-    child.stdin?.write("\n");
-    child.stdin?.end();
-  });
+    this.ready = this.request((id) =>
+      encodeMessage({
+        jsonrpc: "2.0",
+        id,
+        method: "initialize",
+        params: {
+          protocolVersion: "2024-11-05",
+          capabilities: {},
+          clientInfo: { name: clientName, version: "1.0.0" },
+        },
+      })
+    ).then(() => {
+      this.child.stdin.write(
+        encodeMessage({ jsonrpc: "2.0", method: "notifications/initialized" })
+      );
+    });
+    // Failures surface through callTools. A server that fails to initialize
+    // is unusable even if it stays running, so mark the client as exited
+    // (callers then start a fresh one) and stop the process.
+    this.ready.catch((error: Error) => {
+      this.exitError ??= error;
+      this.child.kill();
+    });
+  }
+
+  get exited(): boolean {
+    return this.exitError !== null;
+  }
+
+  async callTools(calls: McpToolCall[]): Promise<JsonRecord[]> {
+    await this.ready;
+    return Promise.all(
+      calls.map((call) => this.request((id) => encodeToolCall(id, call)))
+    );
+  }
+
+  close(): void {
+    this.child.stdin.end();
+  }
+
+  private request(encode: (id: string) => string): Promise<JsonRecord> {
+    if (this.exitError) {
+      return Promise.reject(this.exitError);
+    }
+    const id = `mcp-client-${this.nextId}`;
+    this.nextId += 1;
+    return new Promise((resolve, reject) => {
+      this.pending.set(id, { resolve, reject });
+      this.child.stdin.write(encode(id));
+    });
+  }
+
+  private onMessage(line: string): void {
+    let response: JsonRecord;
+    try {
+      response = JSON.parse(line) as JsonRecord;
+    } catch {
+      return;
+    }
+    const pending = this.pending.get(response.id as string);
+    if (!pending) {
+      return;
+    }
+    this.pending.delete(response.id as string);
+    if (response.error) {
+      pending.reject(new Error(`MCP error: ${JSON.stringify(response.error)}`));
+      return;
+    }
+    pending.resolve((response.result as JsonRecord) ?? {});
+  }
+
+  private onExit(error: Error): void {
+    this.exitError ??= error;
+    for (const pending of this.pending.values()) {
+      pending.reject(this.exitError);
+    }
+    this.pending.clear();
+  }
 }
 
 async function main(): Promise<number> {
@@ -117,17 +228,22 @@ async function main(): Promise<number> {
     }
   }
 
+  const client = new McpClient(args.command);
   try {
-    const result = await callTool(args.command, args.tool, parsedArgs);
+    const [result] = await client.callTools([{ tool: args.tool, arguments: parsedArgs }]);
     console.log(JSON.stringify(result, null, 2));
     return 0;
   } catch (error) {
     console.error(`Error: ${(error as Error).message}`);
     return 1;
+  } finally {
+    client.close();
   }
 }
 
-main().catch((error) => {
-  console.error("Fatal error in MCP client:", error);
-  process.exit(1);
-});
+if (process.argv[1] === fileURLToPath(import.meta.url)) {
+  main().catch((error) => {
+    console.error("Fatal error in MCP client:", error);
+    process.exit(1);
+  });
+}
@@ -3,12 +3,16 @@ import {
   handleQuestion,
   handleCompleted,
   handleError,
-  handleStuck
+  handleStuck,
+  handleEvent,
+  runMcpBatch
 } from '../scripts/event_handler.js';
-import { execFile } from 'child_process';
+import { EventEmitter } from 'events';
+import { PassThrough } from 'stream';
+import { spawn } from 'child_process';
 
 vi.mock('child_process', () => ({
-  execFile: vi.fn(),
+  spawn: vi.fn(),
 }));
 
 describe('event_handler', () => {
@@ -20,27 +24,35 @@ describe('event_handler', () => {
     vi.restoreAllMocks();
   });
 
-  const mockExecFile = (responseResult: any) => {
-    (execFile as any).mockImplementation((cmd, args, opts, callback) => {
-      // If callback is not provided (args/opts shifting), handle it?
-      // But runMcp calls it with (cmd, args, opts, callback).
-
-      const stdout = JSON.stringify({
-        id: 'event-handler',
-        result: responseResult,
-      });
-      // Simulate async callback
-      setTimeout(() => callback(null, stdout, ''), 0);
-
-      return {
-        stdin: {
-          write: vi.fn(),
-          end: vi.fn()
-        }
+  // A fake MCP process: runMcpBatch writes one JSON-RPC request per line to
+  // stdin; `respond` turns the parsed requests into response objects that are
+  // streamed back on stdout before the process exits.
+  const mockSpawn = (respond: (requests: any[]) => any[]) => {
+    (spawn as any).mockImplementation(() => {
+      const child: any = new EventEmitter();
+      child.stdout = new PassThrough();
+      child.stderr = new PassThrough();
+      child.stdin = {
+        on: vi.fn(),
+        end: vi.fn((chunk: string) => {
+          const requests = chunk.split('\n').filter(Boolean).map((line) => JSON.parse(line));
+          setTimeout(() => {
+            for (const response of respond(requests)) {
+              child.stdout.write(JSON.stringify(response) + '\n');
+            }
+            setTimeout(() => child.emit('close', 0, null), 0);
+          }, 0);
+        }),
       };
+      return child;
     });
   };
 
+  // Answer every request with the same result, echoing the request id.
+  const mockMcpResult = (responseResult: any) => {
+    mockSpawn((requests) => requests.map((request) => ({ id: request.id, result: responseResult })));
+  };
+
   describe('handleQuestion', () => {
     it('should log question details', async () => {
       const consoleSpy = vi.spyOn(console, 'error').mockImplementation(() => {});
@@ -61,21 +73,14 @@ describe('event_handler', () => {
       const mcpCommand = ['node', 'mcp.js'];
 
       const artifacts = { diff: 'some-diff' };
-      mockExecFile(artifacts);
+      mockMcpResult(artifacts);
 
       await handleCompleted(event, mcpCommand);
 
       expect(consoleSpy).toHaveBeenCalledWith(expect.stringContaining('[COMPLETED] Job job-1'));
-      // Verify runMcp called execFile
-      expect(execFile).toHaveBeenCalledWith(
-        'node',
-        ['mcp.js'],
-        expect.any(Object),
-        expect.any(Function)
-      );
+      // Verify runMcp spawned the MCP command
+      expect(spawn).toHaveBeenCalledWith('node', ['mcp.js'], expect.any(Object));
       // Verify artifacts logged
-      // Since mockExecFile uses setTimeout, we need to wait for promise resolution?
-      // handleCompleted awaits runMcp, which awaits the callback. So it should be fine.
       expect(consoleSpy).toHaveBeenCalledWith(expect.stringContaining('some-diff'));
     });
 
@@ -86,7 +91,7 @@ describe('event_handler', () => {
         await handleCompleted(event, []);
 
         expect(consoleSpy).toHaveBeenCalledWith(expect.stringContaining('skipping artifact fetch'));
-        expect(execFile).not.toHaveBeenCalled();
+        expect(spawn).not.toHaveBeenCalled();
     });
   });
 
@@ -110,13 +115,100 @@ describe('event_handler', () => {
       const mcpCommand = ['node', 'mcp.js'];
 
       const jobInfo = { status: 'RUNNING' };
-      mockExecFile(jobInfo);
+      mockMcpResult(jobInfo);
 
       await handleStuck(event, mcpCommand);
 
       expect(consoleSpy).toHaveBeenCalledWith(expect.stringContaining('[STUCK] Job job-1'));
-      expect(execFile).toHaveBeenCalled();
+      expect(spawn).toHaveBeenCalled();
       expect(consoleSpy).toHaveBeenCalledWith(expect.stringContaining('RUNNING'));
     });
   });
+
+  describe('runMcpBatch', () => {
+    it('should send all calls to a single MCP process and return results in order', async () => {
+      // Respond out of order to make sure results are matched by id.
+      mockSpawn((requests) =>
+        requests.reverse().map((request) => ({ id: request.id, result: { tool: request.params.name } }))
+      );
+
+      const results = await runMcpBatch(['node', 'mcp.js'], [
+        { tool: 'jules_get_session', arguments: { session_id: 's-1' } },
+        { tool: 'jules_list_activities', arguments: { session_id: 's-1' } },
+      ]);
+
+      expect(spawn).toHaveBeenCalledTimes(1);
+      expect(results).toEqual([
+        { tool: 'jules_get_session' },
+        { tool: 'jules_list_activities' },
+      ]);
+    });
+
+    it('should resolve once every call has a response, before the process exits', async () => {
+      // This fake process answers but never exits.
+      (spawn as any).mockImplementation(() => {
+        const child: any = new EventEmitter();
+        child.stdout = new PassThrough();
+        child.stderr = new PassThrough();
+        child.stdin = {
+          on: vi.fn(),
+          end: vi.fn((chunk: string) => {
+            const [request] = chunk.split('\n').filter(Boolean).map((line) => JSON.parse(line));
+            child.stdout.write(JSON.stringify({ id: request.id, result: { ok: true } }) + '\n');
+          }),
+        };
+        return child;
+      });
+
+      const results = await runMcpBatch(['node', 'mcp.js'], [{ tool: 'jules_get_job', arguments: {} }]);
+
+      expect(results).toEqual([{ ok: true }]);
+    });
+
+    it('should reject with stderr when the process fails', async () => {
+      (spawn as any).mockImplementation(() => {
+        const child: any = new EventEmitter();
+        child.stdout = new PassThrough();
+        child.stderr = new PassThrough();
+        child.stdin = {
+          on: vi.fn(),
+          end: vi.fn(() => {
+            child.stderr.write('missing JULES_API_KEY\n');
+            setTimeout(() => child.emit('close', 1, null), 0);
+          }),
+        };
+        return child;
+      });
+
+      await expect(
+        runMcpBatch(['node', 'mcp.js'], [{ tool: 'jules_get_job', arguments: {} }])
+      ).rejects.toThrow('missing JULES_API_KEY');
+    });
+
+    it('should not spawn a process for an empty batch', async () => {
+      const results = await runMcpBatch(['node', 'mcp.js'], []);
+
+      expect(results).toEqual([]);
+      expect(spawn).not.toHaveBeenCalled();
+    });
+  });
+
+  describe('handleEvent', () => {
+    it('should route events to the handler for their type', async () => {
+      const consoleSpy = vi.spyOn(console, 'error').mockImplementation(() => {});
+
+      await handleEvent({ event: 'error', job_id: 'job-1', message: 'boom' }, []);
+
+      expect(consoleSpy).toHaveBeenCalledWith(expect.stringContaining('[ERROR] Job job-1'));
+    });
+
+    it('should log unknown event types', async () => {
+      const consoleSpy = vi.spyOn(console, 'error').mockImplementation(() => {});
+
+      await handleEvent({ event: 'mystery', job_id: 'job-1' }, []);
+
+      expect(consoleSpy).toHaveBeenCalledWith(expect.stringContaining('[UNKNOWN] Unhandled event type: mystery'));
+      expect(spawn).not.toHaveBeenCalled();
+    });
+  });
 });
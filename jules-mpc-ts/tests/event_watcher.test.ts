@@ -0,0 +1,157 @@
+import { describe, it, expect, vi, beforeEach, afterEach } from 'vitest';
+import { promises as fs } from 'fs';
+import { tmpdir } from 'os';
+import { join } from 'path';
+import { watch } from '../scripts/jules_event_watcher.js';
+
+describe('jules_event_watcher', () => {
+  let dir: string;
+  let eventsPath: string;
+  let statePath: string;
+
+  beforeEach(async () => {
+    vi.spyOn(console, 'error').mockImplementation(() => {});
+    dir = await fs.mkdtemp(join(tmpdir(), 'jules-watcher-'));
+    eventsPath = join(dir, 'events.jsonl');
+    statePath = join(dir, 'state.json');
+  });
+
+  afterEach(async () => {
+    vi.restoreAllMocks();
+    await fs.rm(dir, { recursive: true, force: true });
+  });
+
+  const line = (payload: Record<string, unknown>) => `${JSON.stringify(payload)}\n`;
+
+  // Run the watcher against the temp files, collecting dispatched events.
+  const startWatcher = (stateFlushSeconds = 0) => {
+    const controller = new AbortController();
+    const seen: Record<string, unknown>[] = [];
+    const done = watch(
+      eventsPath,
+      { dispatch: async (event) => { seen.push(event); }, close() {} },
+      'test',
+      0.05,
+      statePath,
+      stateFlushSeconds,
+      controller.signal
+    );
+    const stop = async () => {
+      controller.abort();
+      await done;
+    };
+    return { seen, stop };
+  };
+
+  const savedOffset = async () => JSON.parse(await fs.readFile(statePath, 'utf8')).offset;
+
+  const sleep = (ms: number) => new Promise((resolve) => setTimeout(resolve, ms));
+
+  describe('watch', () => {
+    it('should dispatch a line split across read chunks', async () => {
+      const big = { event: 'completed', job_id: 'big', padding: 'x'.repeat(70 * 1024) };
+      const content = line(big) + line({ event: 'stuck', job_id: 'small' });
+      await fs.writeFile(eventsPath, content);
+
+      const watcher = startWatcher();
+      await vi.waitFor(() => expect(watcher.seen).toHaveLength(2));
+      await watcher.stop();
+
+      expect(watcher.seen).toEqual([big, { event: 'stuck', job_id: 'small' }]);
+      expect(await savedOffset()).toBe(Buffer.byteLength(content));
+    });
+
+    it('should wait for the newline before dispatching a trailing line', async () => {
+      const first = line({ event: 'completed', job_id: 'a' });
+      await fs.writeFile(eventsPath, `${first}{"event":"stuck",`);
+
+      const watcher = startWatcher();
+      await vi.waitFor(() => expect(watcher.seen).toHaveLength(1));
+      await vi.waitFor(async () => expect(await savedOffset()).toBe(first.length));
+
+      await fs.appendFile(eventsPath, '"job_id":"b"}\n');
+      await vi.waitFor(() => expect(watcher.seen).toHaveLength(2));
+      await watcher.stop();
+
+      expect(watcher.seen[1]).toEqual({ event: 'stuck', job_id: 'b' });
+      expect(await savedOffset()).toBe((await fs.stat(eventsPath)).size);
+    });
+
+    it('should start over when the file is truncated', async () => {
+      await fs.writeFile(
+        eventsPath,
+        line({ event: 'completed', job_id: 'a' }) + line({ event: 'completed', job_id: 'b' })
+      );
+
+      const watcher = startWatcher();
+      await vi.waitFor(() => expect(watcher.seen).toHaveLength(2));
+
+      const replacement = line({ event: 'x', job_id: 'c' });
+      await fs.writeFile(eventsPath, replacement);
+      await vi.waitFor(() => expect(watcher.seen).toHaveLength(3));
+      await watcher.stop();
+
+      expect(watcher.seen[2]).toEqual({ event: 'x', job_id: 'c' });
+      expect(await savedOffset()).toBe(replacement.length);
+    });
+
+    it('should reopen the file when it is rotated', async () => {
+      await fs.writeFile(eventsPath, line({ event: 'completed', job_id: 'a' }));
+
+      const watcher = startWatcher();
+      await vi.waitFor(() => expect(watcher.seen).toHaveLength(1));
+
+      await fs.rename(eventsPath, `${eventsPath}.1`);
+      const rotated = line({ event: 'stuck', job_id: 'b' }) + line({ event: 'stuck', job_id: 'c' });
+      await fs.writeFile(eventsPath, rotated);
+      await vi.waitFor(() => expect(watcher.seen).toHaveLength(3));
+      await watcher.stop();
+
+      expect(watcher.seen.map((event) => event.job_id)).toEqual(['a', 'b', 'c']);
+      expect(await savedOffset()).toBe(rotated.length);
+    });
+
+    it('should resume from the persisted offset', async () => {
+      const first = line({ event: 'completed', job_id: 'a' });
+      await fs.writeFile(eventsPath, first + line({ event: 'stuck', job_id: 'b' }));
+      await fs.writeFile(statePath, JSON.stringify({ offset: first.length }));
+
+      const watcher = startWatcher();
+      await vi.waitFor(() => expect(watcher.seen).toHaveLength(1));
+      await watcher.stop();
+
+      expect(watcher.seen).toEqual([{ event: 'stuck', job_id: 'b' }]);
+    });
+
+    it('should not rewrite the state file while idle', async () => {
+      const content = line({ event: 'completed', job_id: 'a' });
+      await fs.writeFile(eventsPath, content);
+
+      const watcher = startWatcher();
+      await vi.waitFor(async () => expect(await savedOffset()).toBe(content.length));
+      const before = await fs.stat(statePath);
+      await sleep(300);
+      await watcher.stop();
+
+      const after = await fs.stat(statePath);
+      expect(after.ino).toBe(before.ino);
+      expect(after.mtimeMs).toBe(before.mtimeMs);
+    });
+
+    it('should defer state writes until the flush interval or shutdown', async () => {
+      const first = line({ event: 'completed', job_id: 'a' });
+      await fs.writeFile(eventsPath, first);
+
+      const watcher = startWatcher(60);
+      await vi.waitFor(async () => expect(await savedOffset()).toBe(first.length));
+
+      await fs.appendFile(eventsPath, line({ event: 'stuck', job_id: 'b' }));
+      await vi.waitFor(() => expect(watcher.seen).toHaveLength(2));
+      await sleep(200);
+      expect(await savedOffset()).toBe(first.length);
+
+      await watcher.stop();
+      expect(await savedOffset()).toBe((await fs.stat(eventsPath)).size);
+    });
+  });
+});
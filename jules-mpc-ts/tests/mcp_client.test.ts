@@ -0,0 +1,113 @@
+import { describe, it, expect, vi, beforeEach, afterEach } from 'vitest';
+import { EventEmitter } from 'events';
+import { PassThrough } from 'stream';
+import { McpClient } from '../src/mcp_client.js';
+import { spawn } from 'child_process';
+
+vi.mock('child_process', () => ({
+  spawn: vi.fn(),
+}));
+
+describe('mcp_client', () => {
+  let written: any[];
+
+  beforeEach(() => {
+    vi.resetAllMocks();
+    written = [];
+  });
+
+  afterEach(() => {
+    vi.restoreAllMocks();
+  });
+
+  // A fake MCP server that answers every request with its method and params,
+  // echoing the request id.
+  const mockServer = () => {
+    const child: any = new EventEmitter();
+    child.stdout = new PassThrough();
+    child.stdin = {
+      write: vi.fn((chunk: string) => {
+        for (const line of chunk.split('\n').filter(Boolean)) {
+          const request = JSON.parse(line);
+          written.push(request);
+          if (request.id !== undefined) {
+            const result = { method: request.method, params: request.params };
+            setTimeout(() => {
+              child.stdout.write(JSON.stringify({ jsonrpc: '2.0', id: request.id, result }) + '\n');
+            }, 0);
+          }
+        }
+      }),
+      end: vi.fn(),
+      on: vi.fn(),
+    };
+    child.kill = vi.fn();
+    (spawn as any).mockReturnValue(child);
+    return child;
+  };
+
+  describe('McpClient', () => {
+    it('should initialize once and reuse the process for every call', async () => {
+      const child = mockServer();
+      const client = new McpClient(['node', 'mcp.js']);
+
+      const [first] = await client.callTools([{ tool: 'jules_get_job', arguments: { job_id: 'a' } }]);
+      const [second] = await client.callTools([{ tool: 'jules_get_job', arguments: { job_id: 'b' } }]);
+      client.close();
+
+      expect(spawn).toHaveBeenCalledTimes(1);
+      expect(written.map((request) => request.method)).toEqual([
+        'initialize',
+        'notifications/initialized',
+        'tools/call',
+        'tools/call',
+      ]);
+      expect(first.params).toEqual({ name: 'jules_get_job', arguments: { job_id: 'a' } });
+      expect(second.params).toEqual({ name: 'jules_get_job', arguments: { job_id: 'b' } });
+      expect(child.stdin.end).toHaveBeenCalled();
+    });
+
+    it('should match concurrent responses by id', async () => {
+      mockServer();
+      const client = new McpClient(['node', 'mcp.js']);
+
+      const results = await client.callTools([
+        { tool: 'one', arguments: {} },
+        { tool: 'two', arguments: {} },
+      ]);
+
+      const ids = written.filter((request) => request.method === 'tools/call').map((request) => request.id);
+      expect(new Set(ids).size).toBe(2);
+      expect(results.map((result) => (result.params as any).name)).toEqual(['one', 'two']);
+    });
+
+    it('should count as exited when initialize fails', async () => {
+      const child = mockServer();
+      child.stdin.write.mockImplementation((chunk: string) => {
+        const request = JSON.parse(chunk);
+        setTimeout(() => {
+          child.stdout.write(
+            JSON.stringify({ jsonrpc: '2.0', id: request.id, error: { code: -32600, message: 'bad init' } }) + '\n'
+          );
+        }, 0);
+      });
+      const client = new McpClient(['node', 'mcp.js']);
+
+      await expect(client.callTools([{ tool: 'one', arguments: {} }])).rejects.toThrow('bad init');
+      expect(client.exited).toBe(true);
+      expect(child.kill).toHaveBeenCalled();
+    });
+
+    it('should reject pending calls when the server exits', async () => {
+      const child = mockServer();
+      child.stdin.write.mockImplementation(() => true);
+      const client = new McpClient(['node', 'mcp.js']);
+
+      const call = client.callTools([{ tool: 'one', arguments: {} }]);
+      child.emit('exit', 1, null);
+
+      await expect(call).rejects.toThrow('MCP server exited (code 1)');
+      expect(client.exited).toBe(true);
+    });
+  });
+});
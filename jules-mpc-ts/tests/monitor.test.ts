@@ -6,7 +6,11 @@ import {
   findActionableActivity,
   sessionStatusUrl,
   sessionActivitiesUrl,
-  buildHeaders
+  buildHeaders,
+  createJobsLoader,
+  EventLog,
+  PollSchedule,
+  saveJson
 } from '../scripts/jules_monitor.js';
 import { promises as fs } from 'fs';
 
@@ -18,6 +22,9 @@ vi.mock('fs', async () => {
       writeFile: vi.fn(),
       appendFile: vi.fn(),
       mkdir: vi.fn(),
+      open: vi.fn(),
+      stat: vi.fn(),
+      rename: vi.fn(),
     }
   };
 });
@@ -26,10 +33,22 @@ vi.mock('fs', async () => {
 const fetchMock = vi.fn();
 vi.stubGlobal('fetch', fetchMock);
 
+// Handle returned by fs.open for the events file
+const eventsHandle = {
+  write: vi.fn(),
+  close: vi.fn(),
+  stat: vi.fn(),
+};
+
 describe('jules_monitor', () => {
   beforeEach(() => {
     vi.resetAllMocks();
     fetchMock.mockReset();
+    (fs.mkdir as any).mockResolvedValue(undefined);
+    (fs.open as any).mockResolvedValue(eventsHandle);
+    eventsHandle.close.mockResolvedValue(undefined);
+    eventsHandle.stat.mockResolvedValue({ ino: 1, dev: 1 });
+    (fs.stat as any).mockResolvedValue({ ino: 1, dev: 1 });
   });
 
   afterEach(() => {
@@ -102,6 +121,11 @@ describe('jules_monitor', () => {
       const lastActivity = new Date(Date.now() - 5 * 60 * 1000).toISOString();
       expect(shouldEmitStuck(lastActivity, 10)).toBe(false);
     });
+
+    it('should accept epoch milliseconds', () => {
+      expect(shouldEmitStuck(Date.now() - 20 * 60 * 1000, 10)).toBe(true);
+      expect(shouldEmitStuck(Date.now() - 5 * 60 * 1000, 10)).toBe(false);
+    });
   });
 
   describe('sessionStatusUrl', () => {
@@ -152,11 +176,158 @@ describe('jules_monitor', () => {
     });
   });
 
+  describe('createJobsLoader', () => {
+    it('should only re-parse the jobs file when it changes', async () => {
+      (fs.stat as any).mockResolvedValue({ mtimeMs: 1000, size: 20 });
+      (fs.readFile as any).mockResolvedValue('{"session_id":"sess-1"}\n');
+
+      const loadJobs = createJobsLoader('jobs.jsonl');
+      expect(await loadJobs()).toEqual([{ session_id: 'sess-1' }]);
+      expect(await loadJobs()).toEqual([{ session_id: 'sess-1' }]);
+      expect(fs.readFile).toHaveBeenCalledTimes(1);
+
+      (fs.stat as any).mockResolvedValue({ mtimeMs: 2000, size: 44 });
+      (fs.readFile as any).mockResolvedValue('{"session_id":"sess-1"}\n{"session_id":"sess-2"}\n');
+
+      expect(await loadJobs()).toEqual([{ session_id: 'sess-1' }, { session_id: 'sess-2' }]);
+      expect(fs.readFile).toHaveBeenCalledTimes(2);
+    });
+
+    it('should return no jobs when the jobs file is missing', async () => {
+      (fs.stat as any).mockRejectedValue(Object.assign(new Error('missing'), { code: 'ENOENT' }));
+
+      const loadJobs = createJobsLoader('jobs.jsonl');
+
+      expect(await loadJobs()).toEqual([]);
+      expect(fs.readFile).not.toHaveBeenCalled();
+    });
+  });
+
+  describe('saveJson', () => {
+    const stateHandle = {
+      writeFile: vi.fn(),
+      sync: vi.fn(),
+      close: vi.fn(),
+    };
+
+    beforeEach(() => {
+      (fs.open as any).mockResolvedValue(stateHandle);
+    });
+
+    it('should write compact JSON and rename it into place', async () => {
+      await saveJson('/tmp/state.json', { 'sess-1': { last_status: 'RUNNING' } });
+
+      expect(fs.open).toHaveBeenCalledWith('/tmp/state.json.tmp', 'w');
+      expect(stateHandle.writeFile).toHaveBeenCalledWith('{"sess-1":{"last_status":"RUNNING"}}', 'utf8');
+      expect(stateHandle.sync).toHaveBeenCalled();
+      expect(fs.rename).toHaveBeenCalledWith('/tmp/state.json.tmp', '/tmp/state.json');
+    });
+
+    it('should indent the JSON when pretty', async () => {
+      await saveJson('/tmp/state.json', { 'sess-1': { last_status: 'RUNNING' } }, true);
+
+      expect(stateHandle.writeFile).toHaveBeenCalledWith(
+        '{\n  "sess-1": {\n    "last_status": "RUNNING"\n  }\n}',
+        'utf8'
+      );
+    });
+  });
+
+  describe('EventLog', () => {
+    it('should keep one handle while the file is unchanged', async () => {
+      const events = new EventLog('events.jsonl');
+
+      await events.append({ event: 'a' });
+      await events.append({ event: 'b' });
+
+      expect(fs.open).toHaveBeenCalledTimes(1);
+      expect(eventsHandle.write).toHaveBeenCalledTimes(2);
+    });
+
+    it('should reopen the file after it is rotated', async () => {
+      const events = new EventLog('events.jsonl');
+      await events.append({ event: 'a' });
+
+      (fs.stat as any).mockResolvedValue({ ino: 2, dev: 1 });
+      await events.append({ event: 'b' });
+
+      expect(eventsHandle.close).toHaveBeenCalledTimes(1);
+      expect(fs.open).toHaveBeenCalledTimes(2);
+    });
+
+    it('should reopen the file after it is removed', async () => {
+      const events = new EventLog('events.jsonl');
+      await events.append({ event: 'a' });
+
+      (fs.stat as any).mockRejectedValue(Object.assign(new Error('gone'), { code: 'ENOENT' }));
+      await events.append({ event: 'b' });
+
+      expect(fs.open).toHaveBeenCalledTimes(2);
+      expect(eventsHandle.write).toHaveBeenCalledTimes(2);
+    });
+  });
+
+  describe('PollSchedule', () => {
+    it('should back off unchanged jobs and reset on change', () => {
+      const schedule = new PollSchedule(10);
+      expect(schedule.isDue('sess-1', 0)).toBe(true);
+
+      schedule.record('sess-1', { changed: false }, 0);
+      expect(schedule.isDue('sess-1', 14)).toBe(false);
+      expect(schedule.isDue('sess-1', 15)).toBe(true);
+
+      schedule.record('sess-1', { changed: false }, 15);
+      expect(schedule.isDue('sess-1', 37)).toBe(false);
+      expect(schedule.isDue('sess-1', 37.5)).toBe(true);
+
+      schedule.record('sess-1', { changed: true }, 40);
+      expect(schedule.isDue('sess-1', 50)).toBe(true);
+    });
+
+    it('should reset the backoff when a new activity appears', () => {
+      const schedule = new PollSchedule(10);
+      schedule.record('sess-1', { changed: false, activity: '1:a' }, 0);
+      schedule.record('sess-1', { changed: false, activity: '1:a' }, 0);
+      expect(schedule.isDue('sess-1', 15)).toBe(false);
+
+      schedule.record('sess-1', { changed: false, activity: '2:b' }, 0);
+      expect(schedule.isDue('sess-1', 10)).toBe(true);
+
+      // A poll that fetched no activities keeps the last marker.
+      schedule.record('sess-1', { changed: false }, 0);
+      expect(schedule.isDue('sess-1', 10)).toBe(false);
+    });
+
+    it('should cap the backoff at ten minutes', () => {
+      const schedule = new PollSchedule(10);
+      for (let index = 0; index < 20; index += 1) {
+        schedule.record('sess-1', { changed: false }, 0);
+      }
+      expect(schedule.isDue('sess-1', 600)).toBe(true);
+    });
+
+    it('should wait until the first job is due, at most the base interval', () => {
+      const schedule = new PollSchedule(10);
+      schedule.record('sess-1', { changed: false }, 0);
+      schedule.record('sess-1', { changed: false }, 0);
+      expect(schedule.secondsUntilDue(['sess-1'], 0)).toBe(10);
+
+      schedule.record('sess-2', { changed: true }, 0);
+      expect(schedule.secondsUntilDue(['sess-1', 'sess-2'], 4)).toBe(6);
+      expect(schedule.secondsUntilDue(['sess-1', 'sess-3'], 4)).toBe(0);
+    });
+  });
+
   describe('monitorOnce', () => {
     const apiBase = 'https://jules.googleapis.com/v1alpha';
     const apiKey = 'test-api-key';
     const eventsPath = 'events.jsonl';
     const stuckMinutes = 10;
+    let events: EventLog;
+
+    beforeEach(() => {
+      events = new EventLog(eventsPath);
+    });
 
     it('should update state and emit completed event on COMPLETED state', async () => {
       const jobs = [{ session_id: 'sess-1' }];
@@ -165,20 +336,17 @@ describe('jules_monitor', () => {
       // Mock status response: COMPLETED
       fetchMock.mockResolvedValueOnce({
         ok: true,
+        headers: new Headers(),
         text: async () => JSON.stringify({ state: 'COMPLETED' }),
       });
 
-      await monitorOnce(jobs, state, apiBase, apiKey, eventsPath, stuckMinutes);
+      await monitorOnce(jobs, state, apiBase, apiKey, events, stuckMinutes);
 
-      expect(fs.appendFile).toHaveBeenCalledWith(
-        eventsPath,
-        expect.stringContaining('"event":"completed"'),
-        'utf8'
+      expect(eventsHandle.write).toHaveBeenCalledWith(
+        expect.stringContaining('"event":"completed"')
       );
-      expect(fs.appendFile).toHaveBeenCalledWith(
-        eventsPath,
-        expect.stringContaining('"session_id":"sess-1"'),
-        'utf8'
+      expect(eventsHandle.write).toHaveBeenCalledWith(
+        expect.stringContaining('"session_id":"sess-1"')
       );
       expect(state['sess-1'].last_status).toBe('COMPLETED');
     });
@@ -189,20 +357,17 @@ describe('jules_monitor', () => {
 
       fetchMock.mockResolvedValueOnce({
         ok: true,
+        headers: new Headers(),
         text: async () => JSON.stringify({ state: 'FAILED' }),
       });
 
-      await monitorOnce(jobs, state, apiBase, apiKey, eventsPath, stuckMinutes);
+      await monitorOnce(jobs, state, apiBase, apiKey, events, stuckMinutes);
 
-      expect(fs.appendFile).toHaveBeenCalledWith(
-        eventsPath,
-        expect.stringContaining('"event":"error"'),
-        'utf8'
+      expect(eventsHandle.write).toHaveBeenCalledWith(
+        expect.stringContaining('"event":"error"')
       );
-      expect(fs.appendFile).toHaveBeenCalledWith(
-        eventsPath,
-        expect.stringContaining('"state":"FAILED"'),
-        'utf8'
+      expect(eventsHandle.write).toHaveBeenCalledWith(
+        expect.stringContaining('"state":"FAILED"')
       );
     });
 
@@ -212,25 +377,20 @@ describe('jules_monitor', () => {
 
       fetchMock.mockResolvedValueOnce({
         ok: true,
+        headers: new Headers(),
         text: async () => JSON.stringify({ state: 'AWAITING_USER_FEEDBACK' }),
       });
 
-      await monitorOnce(jobs, state, apiBase, apiKey, eventsPath, stuckMinutes);
+      await monitorOnce(jobs, state, apiBase, apiKey, events, stuckMinutes);
 
-      expect(fs.appendFile).toHaveBeenCalledWith(
-        eventsPath,
-        expect.stringContaining('"event":"question"'),
-        'utf8'
+      expect(eventsHandle.write).toHaveBeenCalledWith(
+        expect.stringContaining('"event":"question"')
       );
-      expect(fs.appendFile).toHaveBeenCalledWith(
-        eventsPath,
-        expect.stringContaining('"session_id":"sess-1"'),
-        'utf8'
+      expect(eventsHandle.write).toHaveBeenCalledWith(
+        expect.stringContaining('"session_id":"sess-1"')
       );
-      expect(fs.appendFile).toHaveBeenCalledWith(
-        eventsPath,
-        expect.stringContaining('"state":"AWAITING_USER_FEEDBACK"'),
-        'utf8'
+      expect(eventsHandle.write).toHaveBeenCalledWith(
+        expect.stringContaining('"state":"AWAITING_USER_FEEDBACK"')
       );
     });
 
@@ -241,12 +401,14 @@ describe('jules_monitor', () => {
       // Mock status response: RUNNING (not actionable, not AWAITING_USER_FEEDBACK)
       fetchMock.mockResolvedValueOnce({
         ok: true,
+        headers: new Headers(),
         text: async () => JSON.stringify({ state: 'RUNNING' }),
       });
 
       // Mock activities response with a question
       fetchMock.mockResolvedValueOnce({
         ok: true,
+        headers: new Headers(),
         text: async () => JSON.stringify({
           activities: [
             { agentMessaged: { agentMessage: 'Do you want fries with that?' } }
@@ -255,12 +417,10 @@ describe('jules_monitor', () => {
         }),
       });
 
-      await monitorOnce(jobs, state, apiBase, apiKey, eventsPath, stuckMinutes);
+      await monitorOnce(jobs, state, apiBase, apiKey, events, stuckMinutes);
 
-      expect(fs.appendFile).toHaveBeenCalledWith(
-        eventsPath,
-        expect.stringContaining('"event":"question"'),
-        'utf8'
+      expect(eventsHandle.write).toHaveBeenCalledWith(
+        expect.stringContaining('"event":"question"')
       );
       expect(state['sess-1'].cursor).toBe('page2');
     });
@@ -275,27 +435,152 @@ describe('jules_monitor', () => {
       // Mock status response: RUNNING
       fetchMock.mockResolvedValueOnce({
         ok: true,
+        headers: new Headers(),
         text: async () => JSON.stringify({ state: 'RUNNING' }),
       });
 
       // Mock activities response (empty)
       fetchMock.mockResolvedValueOnce({
         ok: true,
+        headers: new Headers(),
         text: async () => JSON.stringify({ activities: [] }),
       });
 
-      await monitorOnce(jobs, state, apiBase, apiKey, eventsPath, stuckMinutes);
+      await monitorOnce(jobs, state, apiBase, apiKey, events, stuckMinutes);
 
-      expect(fs.appendFile).toHaveBeenCalledWith(
-        eventsPath,
-        expect.stringContaining('"event":"stuck"'),
-        'utf8'
+      expect(eventsHandle.write).toHaveBeenCalledWith(
+        expect.stringContaining('"event":"stuck"')
       );
-      expect(fs.appendFile).toHaveBeenCalledWith(
-        eventsPath,
-        expect.stringContaining('"session_id":"sess-1"'),
-        'utf8'
+      expect(eventsHandle.write).toHaveBeenCalledWith(
+        expect.stringContaining('"session_id":"sess-1"')
+      );
+    });
+
+    it('should poll jobs concurrently', async () => {
+      const jobs = [{ session_id: 'sess-1' }, { session_id: 'sess-2' }];
+      const state: Record<string, any> = {};
+
+      // Hold every status response until both requests have been issued.
+      let release!: () => void;
+      const gate = new Promise<void>((resolve) => { release = resolve; });
+      fetchMock.mockImplementation(async () => {
+        await gate;
+        return { ok: true, headers: new Headers(), text: async () => JSON.stringify({ state: 'COMPLETED' }) };
+      });
+
+      const cycle = monitorOnce(jobs, state, apiBase, apiKey, events, stuckMinutes);
+      await vi.waitFor(() => expect(fetchMock).toHaveBeenCalledTimes(2));
+      release();
+      await cycle;
+
+      expect(state['sess-1'].last_status).toBe('COMPLETED');
+      expect(state['sess-2'].last_status).toBe('COMPLETED');
+    });
+
+    it('should limit how many jobs are polled at once', async () => {
+      const jobs = [1, 2, 3, 4, 5].map((n) => ({ session_id: `sess-${n}` }));
+      const state: Record<string, any> = {};
+
+      let inFlight = 0;
+      let maxInFlight = 0;
+      fetchMock.mockImplementation(async () => {
+        inFlight += 1;
+        maxInFlight = Math.max(maxInFlight, inFlight);
+        await new Promise((resolve) => setTimeout(resolve, 0));
+        inFlight -= 1;
+        return { ok: true, headers: new Headers(), text: async () => JSON.stringify({ state: 'COMPLETED' }) };
+      });
+
+      await monitorOnce(jobs, state, apiBase, apiKey, events, stuckMinutes, { concurrency: 2 });
+
+      expect(maxInFlight).toBe(2);
+      expect(Object.keys(state)).toHaveLength(5);
+    });
+
+    it('should write all events of a cycle at once, in job order', async () => {
+      const jobs = [{ session_id: 'sess-1' }, { session_id: 'sess-2' }];
+      const state: Record<string, any> = {};
+
+      fetchMock.mockImplementation(async () => ({
+        ok: true,
+        headers: new Headers(),
+        text: async () => JSON.stringify({ state: 'COMPLETED' }),
+      }));
+
+      await monitorOnce(jobs, state, apiBase, apiKey, events, stuckMinutes);
+
+      expect(fs.open).toHaveBeenCalledTimes(1);
+      expect(fs.open).toHaveBeenCalledWith(eventsPath, 'a');
+      expect(eventsHandle.write).toHaveBeenCalledTimes(1);
+      const lines = eventsHandle.write.mock.calls[0][0].trim().split('\n');
+      expect(lines.map((line: string) => JSON.parse(line).session_id)).toEqual(['sess-1', 'sess-2']);
+    });
+
+    it('should report whether any job state changed', async () => {
+      const jobs = [{ session_id: 'sess-1' }];
+      const state: Record<string, any> = {};
+
+      fetchMock.mockImplementation(async () => ({
+        ok: true,
+        headers: new Headers(),
+        text: async () => JSON.stringify({ state: 'COMPLETED' }),
+      }));
+
+      await expect(
+        monitorOnce(jobs, state, apiBase, apiKey, events, stuckMinutes)
+      ).resolves.toBe(true);
+      await expect(
+        monitorOnce(jobs, state, apiBase, apiKey, events, stuckMinutes)
+      ).resolves.toBe(false);
+    });
+
+    it('should skip jobs that are not due yet', async () => {
+      const jobs = [{ session_id: 'sess-1' }];
+      const state: Record<string, any> = {};
+      const schedule = new PollSchedule(45);
+
+      fetchMock.mockImplementation(async () => ({
+        ok: true,
+        headers: new Headers(),
+        text: async () => JSON.stringify({ state: 'COMPLETED' }),
+      }));
+
+      await monitorOnce(jobs, state, apiBase, apiKey, events, stuckMinutes, { schedule });
+      await monitorOnce(jobs, state, apiBase, apiKey, events, stuckMinutes, { schedule });
+
+      expect(fetchMock).toHaveBeenCalledTimes(1);
+    });
+
+    it('should send If-None-Match and skip unchanged statuses', async () => {
+      const jobs = [{ session_id: 'sess-1' }];
+      const state: Record<string, any> = {};
+
+      fetchMock.mockResolvedValueOnce({
+        ok: true,
+        status: 200,
+        headers: new Headers({ ETag: '"v1"' }),
+        text: async () => JSON.stringify({ state: 'COMPLETED' }),
+      });
+      await monitorOnce(jobs, state, apiBase, apiKey, events, stuckMinutes);
+      expect(state['sess-1'].etag).toBe('"v1"');
+
+      fetchMock.mockResolvedValueOnce({
+        ok: false,
+        headers: new Headers(),
+        status: 304,
+        text: async () => '',
+      });
+      await expect(
+        monitorOnce(jobs, state, apiBase, apiKey, events, stuckMinutes)
+      ).resolves.toBe(false);
+
+      expect(fetchMock).toHaveBeenLastCalledWith(
+        expect.stringContaining('/sessions/sess-1'),
+        expect.objectContaining({
+          headers: expect.objectContaining({ 'If-None-Match': '"v1"' }),
+        }),
       );
+      expect(eventsHandle.write).toHaveBeenCalledTimes(1);
     });
 
     it('should pass x-goog-api-key header in fetch calls', async () => {
@@ -304,10 +589,11 @@ describe('jules_monitor', () => {
 
       fetchMock.mockResolvedValueOnce({
         ok: true,
+        headers: new Headers(),
         text: async () => JSON.stringify({ state: 'COMPLETED' }),
       });
 
-      await monitorOnce(jobs, state, apiBase, apiKey, eventsPath, stuckMinutes);
+      await monitorOnce(jobs, state, apiBase, apiKey, events, stuckMinutes);
 
       expect(fetchMock).toHaveBeenCalledWith(
         expect.stringContaining('/sessions/sess-1'),